@@ -184,7 +184,10 @@ export default function App() {
             stopPolling();
             setLoading(false);
 
-            if (data.output.status === "success" && data.output.audio_base64) {
+            if (data.output.status === "success" && data.output.audio_url) {
+              setAudioSrc(data.output.audio_url);
+              setInferenceTime(data.output.inference_time_sec);
+            } else if (data.output.status === "success" && data.output.audio_base64) {
               const blob = base64ToBlob(data.output.audio_base64, "audio/mpeg");
               const url = URL.createObjectURL(blob);
               setAudioSrc(url);
@@ -3,15 +3,47 @@ RunPod Serverless Handler for HeartMuLa Music Generation
 """
 
 import os
-import subprocess
+import mmap
+import asyncio
+import base64
 import time
-import uuid
 import logging
+import functools
+import itertools
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+CHECKPOINTS_PATH = os.environ.get("CHECKPOINTS_PATH", "/runpod-volume/checkpoints")
+
+# ─── Persistent caches on the network volume (must be set before torch / huggingface_hub import) ───
+# Inductor/Triton/CUDA JIT artifacts survive cold starts, so only the first worker pays compile cost.
+CACHE_DIRS = {
+    "TORCHINDUCTOR_CACHE_DIR": f"{CHECKPOINTS_PATH}/.cache/inductor",
+    "TRITON_CACHE_DIR": f"{CHECKPOINTS_PATH}/.cache/triton",
+    "CUDA_CACHE_PATH": f"{CHECKPOINTS_PATH}/.cache/nv",
+    "HF_HOME": f"{CHECKPOINTS_PATH}/.cache/hf",
+}
+for _var, _path in CACHE_DIRS.items():
+    os.environ.setdefault(_var, _path)
+
+# hf_transfer (Rust, multi-connection) must be enabled before huggingface_hub is imported
+os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
 import torch
 import runpod
+from heartlib import HeartMuLaGenPipeline
+from huggingface_hub import HfApi, snapshot_download
+
+# ─── Torch runtime: inference only, tensor-core friendly matmuls ───
+# Grad mode is thread-local, so loading/generation threads also enter torch.inference_mode()
+torch.set_grad_enabled(False)
+# cudnn.benchmark stays off: duration_ms is unbucketed (1000..MAX_DURATION_MS), so nearly every
+# request hands the codec a new input shape and would re-run cuDNN autotuning each time.
+torch.backends.cudnn.benchmark = False
+torch.backends.cuda.matmul.allow_tf32 = True
+torch.set_float32_matmul_precision("high")
 
 # ─── Logging ───
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -19,54 +51,191 @@ log = logging.getLogger("heartmula-worker")
 
 # ─── Global singleton: load model ONCE, reuse across requests ───
 PIPELINE = None
-CHECKPOINTS_PATH = os.environ.get("CHECKPOINTS_PATH", "/runpod-volume/checkpoints")
+_LOAD_LOCK = threading.Lock()  # held for the whole load; callers during warmup block on it
+_CHECKPOINTS_READY = False
 
 # ─── Limits ───
 MAX_DURATION_MS = int(os.environ.get("MAX_DURATION_MS", "240000"))  # 4 minutes max
 JOB_TIMEOUT_SEC = int(os.environ.get("JOB_TIMEOUT_SEC", "300"))     # 5 minutes max
 
+# ─── Checkpoint sync ───
+# Markers are re-validated against the Hub revision on boot; the lookup is skipped when
+# HF_HUB_OFFLINE or CHECKPOINTS_PINNED is set, and bounded by HF_HUB_LOOKUP_TIMEOUT_SEC otherwise.
+HF_HUB_OFFLINE = os.environ.get("HF_HUB_OFFLINE", "0").lower() in ("1", "on", "true", "yes")
+CHECKPOINTS_PINNED = os.environ.get("CHECKPOINTS_PINNED", "0") == "1"
+HF_HUB_LOOKUP_TIMEOUT_SEC = float(os.environ.get("HF_HUB_LOOKUP_TIMEOUT_SEC", "10"))
+
+# ─── Precision ───
+# Codec runs in bf16 by default to halve decoder memory traffic; set "float32" to restore full precision
+_codec_dtype_name = os.environ.get("CODEC_DTYPE", "bfloat16")
+CODEC_DTYPE = getattr(torch, _codec_dtype_name, None)
+if not isinstance(CODEC_DTYPE, torch.dtype):
+    raise ValueError(f"CODEC_DTYPE={_codec_dtype_name!r} is not a torch dtype (use bfloat16, float16 or float32)")
+
+# ─── Output delivery ───
+# With S3_BUCKET set, MP3s are uploaded (RunPod S3-compatible API or AWS) and returned as a presigned URL.
+# Without it, or with RETURN_INLINE=1, the MP3 is returned base64-encoded in the response.
+S3_ENDPOINT = os.environ.get("RUNPOD_S3_ENDPOINT")  # None → default AWS endpoint
+S3_BUCKET = os.environ.get("S3_BUCKET")
+S3_PREFIX = os.environ.get("S3_PREFIX", "heartmula/")
+S3_URL_EXPIRES_SEC = int(os.environ.get("S3_URL_EXPIRES_SEC", "3600"))
+RETURN_INLINE = os.environ.get("RETURN_INLINE") == "1" or not S3_BUCKET
+S3 = None
+if not RETURN_INLINE:
+    import boto3  # only needed for S3 delivery; skipped on inline deployments to save cold-start time
+    S3 = boto3.client("s3", endpoint_url=S3_ENDPOINT)
+
+# ─── Temp output ───
+# Generated MP3s are written to RAM-backed tmpfs rather than the container's overlayfs /tmp
+MP3_TMPDIR = os.environ.get("MP3_TMPDIR", "/dev/shm")
+if not (os.path.isdir(MP3_TMPDIR) and os.access(MP3_TMPDIR, os.W_OK)):
+    MP3_TMPDIR = tempfile.gettempdir()
+
+# pid + counter names are unique within the process without drawing from os.urandom per job
+_TMP_PREFIX = f"{os.getpid():x}"
+_TMP_COUNTER = itertools.count()
+
+# ─── Concurrency ───
+# A worker takes one job, plus one more per job currently delivering its MP3 (encode/upload),
+# up to MAX_CONCURRENCY. A second job is never pulled just to queue behind a full generation.
+MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", "2"))
+_IN_DELIVERY = 0  # jobs past generation, in post-processing; only touched on the event loop
+# Generation runs on one dedicated thread, which serializes GPU work across concurrent jobs
+_GPU_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gpu")
+_POSTPROCESS_POOL = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="postprocess")
+
+
+
+def _make_parser(cast, default, min_value, max_value):
+    """Build a parser for one numeric parameter with its default and bounds baked in."""
+    def parse(value):
+        try:
+            parsed = cast(value)
+        except (TypeError, ValueError, OverflowError):  # OverflowError: int(float("inf"))
+            return default
+        if parsed != parsed:  # NaN compares false against both bounds
+            return default
+        if parsed < min_value:
+            return min_value
+        if parsed > max_value:
+            return max_value
+        return parsed
+    return parse
+
+
+_parse_duration_ms = _make_parser(int, 120000, 1000, MAX_DURATION_MS)
+_parse_temperature = _make_parser(float, 1.0, 0.1, 5.0)
+_parse_topk = _make_parser(int, 50, 1, 200)
+_parse_cfg_scale = _make_parser(float, 1.5, 0.1, 10.0)
+
+
+def _nonempty(value):
+    """True if value is a str with at least one non-whitespace character."""
+    return isinstance(value, str) and bool(value) and not value.isspace()
+
+
+def _trim(value):
+    """Strip surrounding whitespace, skipping the copy when there is none."""
+    if value[0].isspace() or value[-1].isspace():
+        return value.strip()
+    return value
+
+
+def _tmp_output():
+    """Create the temp MP3 output file; returns (fd, path).
+
+    The pipeline selects the encoder from save_path's suffix, so an anonymous
+    O_TMPFILE (/proc/self/fd/N) path is not an option. Keeping the fd open
+    instead lets the result be read back without reopening the file.
+    """
+    while True:
+        tmp_path = os.path.join(MP3_TMPDIR, f"{_TMP_PREFIX}-{next(_TMP_COUNTER):x}.mp3")
+        try:
+            fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            # Leftover from a crashed process that had the same pid; take the next name
+            continue
+        return fd, tmp_path
+
+
+def _remote_revision(repo_id):
+    """Return the current commit hash of repo_id on the Hub, or None if unreachable or disabled."""
+    if HF_HUB_OFFLINE or CHECKPOINTS_PINNED:
+        return None
+    try:
+        return HfApi().model_info(repo_id, timeout=HF_HUB_LOOKUP_TIMEOUT_SEC).sha
+    except Exception as e:
+        log.warning(f"  Could not resolve revision for {repo_id}: {e}")
+        return None
+
 
-def _parse_int(value, default, min_value=None, max_value=None):
-    """Parse int safely with optional bounds."""
+def _write_marker(marker, revision):
+    """Atomically write the completion marker (temp file + os.replace)."""
+    fd, tmp = tempfile.mkstemp(dir=marker.parent, prefix=".complete.")
     try:
-        parsed = int(value)
-    except (TypeError, ValueError):
-        parsed = default
+        with os.fdopen(fd, "w") as f:
+            f.write(revision)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, marker)
+    except BaseException:
+        os.unlink(tmp)
+        raise
 
-    if min_value is not None:
-        parsed = max(min_value, parsed)
-    if max_value is not None:
-        parsed = min(max_value, parsed)
-    return parsed
 
+def _download_repo(repo_id, local_dir):
+    """Download a single HF repo snapshot into local_dir unless already complete.
 
-def _parse_float(value, default, min_value=None, max_value=None):
-    """Parse float safely with optional bounds."""
-    try:
-        parsed = float(value)
-    except (TypeError, ValueError):
-        parsed = default
+    Each repo keeps its own `.complete` marker holding the downloaded revision,
+    so an interrupted or outdated repo is re-fetched without touching the others.
+    """
+    marker = Path(local_dir) / ".complete"
+    cached = marker.read_text().strip() if marker.exists() else None
+    revision = _remote_revision(repo_id)
 
-    if min_value is not None:
-        parsed = max(min_value, parsed)
-    if max_value is not None:
-        parsed = min(max_value, parsed)
-    return parsed
+    # Offline, pinned or Hub too slow (revision unknown): trust any existing marker
+    if cached and (revision is None or cached == revision):
+        log.info(f"  {repo_id} already on network volume ({cached[:12]}).")
+        return
+
+    log.info(f"  Downloading {repo_id} → {local_dir}")
+    start = time.time()
+    os.makedirs(local_dir, exist_ok=True)
+    snapshot_download(repo_id=repo_id, local_dir=local_dir, revision=revision, max_workers=8)
+    _write_marker(marker, revision or "unknown")
+    elapsed = time.time() - start
+    log.info(f"  {repo_id} downloaded in {elapsed:.0f}s")
+
+
+def _adopt_legacy_marker(legacy, downloads):
+    """Convert a volume downloaded under the old single `.download_complete` marker.
+
+    Repos are assumed complete and get a per-repo marker, so upgrading does not
+    trigger a full re-download.
+    """
+    log.info("Legacy .download_complete marker found; adopting existing checkpoints.")
+    for repo_id, local_dir in downloads:
+        marker = Path(local_dir) / ".complete"
+        if not marker.exists():
+            _write_marker(marker, _remote_revision(repo_id) or "legacy")
+    # Workers share the volume; another one booting concurrently may have removed it already
+    legacy.unlink(missing_ok=True)
 
 
 def ensure_checkpoints():
     """Download checkpoints to network volume if not already present.
 
-    Uses a marker file to avoid re-downloading on subsequent cold starts.
+    Uses per-repo marker files to avoid re-downloading on subsequent cold starts.
     The network volume persists across worker restarts.
     """
-    marker = Path(CHECKPOINTS_PATH) / ".download_complete"
-    if marker.exists():
-        log.info("Checkpoints already on network volume (marker found).")
+    global _CHECKPOINTS_READY
+
+    if _CHECKPOINTS_READY:
         return
 
-    log.info("Checkpoints not found on network volume. Downloading...")
     os.makedirs(CHECKPOINTS_PATH, exist_ok=True)
+    for var in CACHE_DIRS:
+        os.makedirs(os.environ[var], exist_ok=True)
 
     downloads = [
         ("HeartMuLa/HeartMuLaGen", CHECKPOINTS_PATH),
@@ -74,19 +243,47 @@ def ensure_checkpoints():
         ("HeartMuLa/HeartCodec-oss-20260123", f"{CHECKPOINTS_PATH}/HeartCodec-oss"),
     ]
 
-    for repo_id, local_dir in downloads:
-        log.info(f"  Downloading {repo_id} → {local_dir}")
-        start = time.time()
-        subprocess.run(
-            ["huggingface-cli", "download", repo_id, "--local-dir", local_dir],
-            check=True,
-        )
-        elapsed = time.time() - start
-        log.info(f"  {repo_id} downloaded in {elapsed:.0f}s")
+    legacy = Path(CHECKPOINTS_PATH) / ".download_complete"
+    if legacy.exists():
+        _adopt_legacy_marker(legacy, downloads)
+
+    # Repos download concurrently; each one also fetches its files in parallel.
+    with ThreadPoolExecutor(max_workers=len(downloads)) as pool:
+        # list() re-raises the first download error
+        list(pool.map(lambda d: _download_repo(*d), downloads))
 
-    # Mark download complete
-    marker.touch()
-    log.info("All checkpoints downloaded successfully.")
+    _CHECKPOINTS_READY = True
+    log.info("All checkpoints present.")
+
+
+def _prefetch_weights():
+    """Hint the kernel to start reading weight files into the page cache.
+
+    Readahead stays at the default window otherwise; with WILLNEED the reads
+    overlap with pipeline construction instead of serializing behind it.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+
+    for root, dirs, files in os.walk(CHECKPOINTS_PATH):
+        # Skip .cache/ (compile + HF caches, potentially thousands of files) and other hidden dirs
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if not name.endswith((".safetensors", ".bin")):
+                continue
+            path = os.path.join(root, name)
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                # Advice values are not bit flags, so they are issued separately
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            except OSError as e:
+                log.debug(f"fadvise failed for {path}: {e}")
+            finally:
+                os.close(fd)
 
 
 def load_model():
@@ -97,31 +294,87 @@ def load_model():
         log.info("Pipeline already loaded, reusing.")
         return PIPELINE
 
-    # Ensure checkpoints are on the network volume
-    ensure_checkpoints()
+    # Double-checked locking: concurrent callers during warmup wait for a single load
+    with _LOAD_LOCK:
+        if PIPELINE is not None:
+            return PIPELINE
 
-    log.info(f"Loading HeartMuLa pipeline from {CHECKPOINTS_PATH} ...")
-    start = time.time()
+        # Ensure checkpoints are on the network volume
+        ensure_checkpoints()
+
+        log.info(f"Loading HeartMuLa pipeline from {CHECKPOINTS_PATH} ...")
+        start = time.time()
+
+        _prefetch_weights()
 
-    from heartlib import HeartMuLaGenPipeline
+        with torch.inference_mode():
+            PIPELINE = HeartMuLaGenPipeline.from_pretrained(
+                pretrained_path=CHECKPOINTS_PATH,
+                device={"mula": torch.device("cuda"), "codec": torch.device("cuda")},
+                dtype={"mula": torch.bfloat16, "codec": CODEC_DTYPE},
+                version="3B",
+                lazy_load=False,
+            )
 
-    PIPELINE = HeartMuLaGenPipeline.from_pretrained(
-        pretrained_path=CHECKPOINTS_PATH,
-        device={"mula": torch.device("cuda"), "codec": torch.device("cuda")},
-        dtype={"mula": torch.bfloat16, "codec": torch.float32},
-        version="3B",
-        lazy_load=False,
+        elapsed = time.time() - start
+        log.info(f"Pipeline loaded in {elapsed:.1f}s")
+        return PIPELINE
+
+
+def _encode_inline(fd):
+    """Base64-encode the MP3 behind fd for an inline response."""
+    # mmap lets b64encode read the page cache directly instead of copying the file into a bytes object
+    with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+        return base64.b64encode(mm).decode("ascii")
+
+
+def _upload_output(tmp_path, job_id):
+    """Upload the MP3 to S3 and return a presigned download URL."""
+    key = f"{S3_PREFIX}{job_id}.mp3"
+    S3.upload_file(tmp_path, S3_BUCKET, key, ExtraArgs={"ContentType": "audio/mpeg"})
+    return S3.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": S3_BUCKET, "Key": key},
+        ExpiresIn=S3_URL_EXPIRES_SEC,
     )
 
-    elapsed = time.time() - start
-    log.info(f"Pipeline loaded in {elapsed:.1f}s")
-    return PIPELINE
+
+def _generate(pipe, inputs, tmp_path, **params):
+    """Run the pipeline into tmp_path (on the _GPU_EXECUTOR thread); returns generation time in seconds."""
+    with torch.inference_mode():
+        start = time.time()
+        pipe(inputs, save_path=tmp_path, **params)
+        return time.time() - start
+
+
+def _deliver(fd, tmp_path, job_id):
+    """Turn the generated MP3 into response fields (inline base64 or S3 URL)."""
+    if RETURN_INLINE:
+        return {"audio_base64": _encode_inline(fd)}
+    return {"audio_url": _upload_output(tmp_path, job_id)}
+
+
+def _concurrency(current):
+    """RunPod concurrency_modifier: admit an extra job only while another is delivering."""
+    return min(1 + _IN_DELIVERY, MAX_CONCURRENCY)
+
+
+def _preload_async():
+    """Preload the pipeline into the GPU at startup; handlers block on _LOAD_LOCK meanwhile."""
+    try:
+        load_model()
+    except Exception as e:
+        # Handlers will retry load_model() and report the error per job
+        log.warning(f"Preload skipped due to startup issue: {e}")
 
 
-def handler(job):
+async def handler(job):
     """
     RunPod handler function.
 
+    Async so the next job's generation can overlap the previous job's encoding/upload
+    (see _concurrency); generation itself is serialized on the GPU thread.
+
     Expected input:
     {
         "lyrics": "your lyrics here...",
@@ -135,70 +388,76 @@ def handler(job):
     Returns:
     {
         "status": "success",
-        "audio_base64": "...",       # base64 encoded MP3
+        "audio_url": "...",          # presigned S3 URL of the MP3
+        "audio_base64": "...",       # base64 encoded MP3 instead, if RETURN_INLINE
         "duration_sec": 120,
         "inference_time_sec": 45.2
     }
     """
+    global _IN_DELIVERY
+
     job_input = job["input"]
 
     # ─── Validate input ───
-    lyrics = job_input.get("lyrics", "").strip()
-    tags = job_input.get("tags", "").strip()
+    lyrics = job_input.get("lyrics")
+    tags = job_input.get("tags")
 
-    if not lyrics:
+    if not _nonempty(lyrics):
         return {"status": "error", "message": "lyrics is required"}
-    if not tags:
+    if not _nonempty(tags):
         return {"status": "error", "message": "tags is required"}
 
-    duration_ms = _parse_int(job_input.get("duration_ms", 120000), 120000, min_value=1000, max_value=MAX_DURATION_MS)
-    temperature = _parse_float(job_input.get("temperature", 1.0), 1.0, min_value=0.1, max_value=5.0)
-    topk = _parse_int(job_input.get("topk", 50), 50, min_value=1, max_value=200)
-    cfg_scale = _parse_float(job_input.get("cfg_scale", 1.5), 1.5, min_value=0.1, max_value=10.0)
+    lyrics = _trim(lyrics)
+    tags = _trim(tags)
+
+    duration_ms = _parse_duration_ms(job_input.get("duration_ms"))
+    temperature = _parse_temperature(job_input.get("temperature"))
+    topk = _parse_topk(job_input.get("topk"))
+    cfg_scale = _parse_cfg_scale(job_input.get("cfg_scale"))
 
     log.info(f"Job {job['id']}: lyrics={len(lyrics)} chars, tags='{tags}', duration={duration_ms}ms")
 
-    # ─── Load model ───
+    # ─── Load model (waits for an in-flight preload, or loads lazily) ───
     try:
-        pipe = load_model()
+        pipe = await asyncio.to_thread(load_model)
     except Exception as e:
         log.error(f"Model load failed: {e}")
         return {"status": "error", "message": f"Model load failed: {str(e)}"}
 
     # ─── Generate ───
+    fd = None
     try:
-        start = time.time()
-
-        # Create temp file for output
-        tmp_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4().hex}.mp3")
-
-        pipe(
+        fd, tmp_path = _tmp_output()
+        loop = asyncio.get_running_loop()
+        inference_time = await loop.run_in_executor(_GPU_EXECUTOR, functools.partial(
+            _generate,
+            pipe,
             {"lyrics": lyrics, "tags": tags},
-            save_path=tmp_path,
+            tmp_path,
             max_audio_length_ms=duration_ms,
             temperature=temperature,
             topk=topk,
             cfg_scale=cfg_scale,
-        )
-
-        inference_time = time.time() - start
+        ))
         log.info(f"Job {job['id']}: generated in {inference_time:.1f}s")
 
-        # ─── Read and encode MP3 ───
-        import base64
-        with open(tmp_path, "rb") as f:
-            audio_bytes = f.read()
-        audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
-
-        # Clean up temp file
-        os.remove(tmp_path)
-
-        file_size_mb = len(audio_bytes) / (1024 * 1024)
+        # ─── Deliver MP3 (off the GPU path) ───
+        file_size = os.fstat(fd).st_size
+        _IN_DELIVERY += 1
+        try:
+            audio = await loop.run_in_executor(_POSTPROCESS_POOL, _deliver, fd, tmp_path, job["id"])
+        except Exception as e:
+            log.error(f"Job {job['id']} delivery failed: {e}")
+            return {"status": "error", "message": f"Delivery failed: {str(e)}"}
+        finally:
+            _IN_DELIVERY -= 1
+
+        file_size_mb = file_size / (1024 * 1024)
         log.info(f"Job {job['id']}: output {file_size_mb:.1f}MB, inference {inference_time:.1f}s")
 
         return {
             "status": "success",
-            "audio_base64": audio_base64,
+            **audio,
             "duration_ms": duration_ms,
             "inference_time_sec": round(inference_time, 1),
             "file_size_mb": round(file_size_mb, 2),
@@ -208,12 +467,25 @@ def handler(job):
         log.error(f"Job {job['id']} generation failed: {e}")
         return {"status": "error", "message": f"Generation failed: {str(e)}"}
 
+    finally:
+        # Clean up temp file (also on failure, so aborted jobs don't leak files)
+        if fd is not None:
+            os.close(fd)
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+
 
 # ─── Entry point ───
 if __name__ == "__main__":
     log.info("Starting HeartMuLa worker...")
     log.info(f"CHECKPOINTS_PATH: {CHECKPOINTS_PATH}")
     log.info(f"MAX_DURATION_MS: {MAX_DURATION_MS}")
+    log.info(f"CODEC_DTYPE: {CODEC_DTYPE}")
+    log.info(f"MAX_CONCURRENCY: {MAX_CONCURRENCY}")
+    log.info(f"MP3_TMPDIR: {MP3_TMPDIR}")
+    log.info(f"Output: {'inline base64' if RETURN_INLINE else f's3://{S3_BUCKET}/{S3_PREFIX}'}")
     log.info(f"CUDA available: {torch.cuda.is_available()}")
 
     if torch.cuda.is_available():
@@ -221,17 +493,24 @@ if __name__ == "__main__":
         log.info(f"VRAM: {torch.cuda.get_device_properties(0).total_memory / 1024**3:.1f} GB")
         log.info(f"CUDA arch: {torch.cuda.get_device_capability(0)}")
 
-    # Diagnostics: verify bitsandbytes CUDA support
-    try:
-        import bitsandbytes as bnb
-        log.info(f"bitsandbytes version: {bnb.__version__}")
-    except Exception as e:
-        log.warning(f"bitsandbytes import issue: {e}")
+    # Diagnostics: verify bitsandbytes CUDA support (opt-in, the import costs cold-start time)
+    if os.environ.get("DIAG_BNB"):
+        try:
+            import bitsandbytes as bnb
+            log.info(f"bitsandbytes version: {bnb.__version__}")
+        except Exception as e:
+            log.warning(f"bitsandbytes import issue: {e}")
 
-    # Preload model (downloads checkpoints on first run, then loads into GPU)
+    # Sync checkpoints before taking jobs (first run downloads them; bounded by RUNPOD_INIT_TIMEOUT)
     try:
-        load_model()
+        ensure_checkpoints()
     except Exception as e:
-        log.warning(f"Preload skipped due to startup issue: {e}")
+        log.warning(f"Checkpoint sync failed at startup, retrying on first job: {e}")
+
+    # Load into GPU in the background so the runtime can start while weights are loading
+    threading.Thread(target=_preload_async, name="preload", daemon=True).start()
 
-    runpod.serverless.start({"handler": handler})
+    runpod.serverless.start({
+        "handler": handler,
+        "concurrency_modifier": _concurrency,
+    })